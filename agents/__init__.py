@@ -0,0 +1,4 @@
+"""
+PROCBOT agents
+Specialist and coordinator agents built from config/agent_config.yaml
+"""
@@ -5,31 +5,37 @@ All configuration comes from YAML - NO hardcoded instructions!
 """
 
 from agno import Agent
-import yaml
-from pathlib import Path
+from agno.models.anthropic import Claude
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from utils.agent_team import claude_model, consult_in_parallel
+from utils.config_loader import get_all_agent_configs
 
 def load_agent_config(agent_name: str) -> dict:
     """Load configuration for a specific agent from YAML"""
-    config_path = Path("config/agent_config.yaml")
-    with open(config_path, 'r') as f:
-        config = yaml.safe_load(f)
-    return config.get(agent_name, {})
+    return get_all_agent_configs().get(agent_name, {})
 
 def create_agent_from_config(agent_name: str) -> Agent:
-    """Create an agent entirely from YAML configuration"""
+    """
+    Create an agent entirely from YAML configuration
+    
+    Every call builds a new Agent: an agno Agent keeps per-run state, so
+    coordinators serving concurrent requests must not share specialists.
+    Only the immutable inputs are shared, i.e. the parsed config and the
+    HTTP connection pool of the Claude client.
+    """
     config = load_agent_config(agent_name)
     
-    agent = Agent(
+    return Agent(
         name=config['name'],
         role=config['role'],
-        model=config['model_id'],
+        model=claude_model(config['model_id']),
         description=config['description'],
         instructions=config['instructions'],
         markdown=config['settings']['markdown'],
         show_tool_calls=False
     )
-    
-    return agent
 
 def create_business_requirements_agent():
     """Create the Business Requirements Analyst agent"""
@@ -51,35 +57,61 @@ def create_summary_agent():
     """Create the Executive Summary Writer agent"""
     return create_agent_from_config('executive_summary')
 
+def create_parallel_consult_tool(team: list) -> Callable[[list[dict]], str]:
+    """Create a tool that lets the coordinator run several specialists at once"""
+    members = {agent.name: agent for agent in team}
+    
+    def consult_specialists_in_parallel(requests: list[dict]) -> str:
+        """
+        Send independent tasks to several specialists at the same time.
+        Use this instead of transferring tasks one by one when a request needs
+        two or more specialists whose work does not depend on each other.
+        
+        Args:
+            requests: List of {"specialist": <team member name>, "task": <task>} items
+        """
+        tasks = []
+        for item in requests:
+            name = item.get('specialist')
+            if name not in members:
+                return f"Unknown specialist: {name}. Team members are: {', '.join(members)}"
+            tasks.append((name, item.get('task', '')))
+        
+        answers = asyncio.run(consult_in_parallel(tasks, lambda name, task: members[name].run(task).content))
+        
+        return "\n\n".join(f"## {name}\n\n{answer}" for name, answer in answers.items())
+    
+    return consult_specialists_in_parallel
+
 def create_coordinator_with_team():
     """Create coordinator with full specialist team - all from YAML config"""
     
     # Load coordinator config (everything comes from YAML!)
     config = load_agent_config('coordinator')
     
-    # Create specialist agents
-    business_req_agent = create_business_requirements_agent()
-    market_research_agent = create_market_research_agent()
-    rfi_rfp_agent = create_rfi_rfp_agent()
-    evaluation_agent = create_evaluation_agent()
-    summary_agent = create_summary_agent()
+    # Create specialist agents (independent of each other, so in parallel)
+    specialist_factories = [
+        create_business_requirements_agent,
+        create_market_research_agent,
+        create_rfi_rfp_agent,
+        create_evaluation_agent,
+        create_summary_agent
+    ]
+    with ThreadPoolExecutor(max_workers=len(specialist_factories)) as executor:
+        futures = [executor.submit(factory) for factory in specialist_factories]
+        team = [future.result() for future in futures]
     
     # Create coordinator with specialist tools
     coordinator = Agent(
         name=config['name'],
         role=config['role'],
-        model=config['model_id'],
+        model=Claude(id=config['model_id'], cache_system_prompt=True),
         description=config['description'],  # All instructions in YAML!
         instructions=config['instructions'],
         markdown=config['settings']['markdown'],
         show_tool_calls=False,
-        team=[
-            business_req_agent,
-            market_research_agent,
-            rfi_rfp_agent,
-            evaluation_agent,
-            summary_agent
-        ]
+        team=team,
+        tools=[create_parallel_consult_tool(team)]
     )
     
     return coordinator
@@ -6,16 +6,11 @@ Configuration is loaded from config/agent_config.yaml
 
 from agno.agent import Agent
 from agno.models.anthropic import Claude
-import os
-import sys
-from dotenv import load_dotenv
-
-# Add parent directory to path to import utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.env import ensure_env
 from utils.config_loader import load_agent_config
 
 # Load environment variables
-load_dotenv()
+ensure_env()
 
 def create_coordinator_agent():
     """
@@ -28,7 +23,7 @@ def create_coordinator_agent():
     agent = Agent(
         name=config['name'],
         role=config['role'],
-        model=Claude(id=config['model_id']),
+        model=Claude(id=config['model_id'], cache_system_prompt=True),
         description=config['description'],
         instructions=config['instructions'],
         markdown=config['settings']['markdown']
@@ -5,14 +5,10 @@ Loads configuration from config/agent_config.yaml
 
 from agno.agent import Agent
 from agno.models.anthropic import Claude
-import os
-import sys
-from dotenv import load_dotenv
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.env import ensure_env
 from utils.config_loader import load_agent_config
 
-load_dotenv()
+ensure_env()
 
 def create_evaluation_agent():
     """Creates Evaluation Agent using external config"""
@@ -21,7 +17,7 @@ def create_evaluation_agent():
     agent = Agent(
         name=config['name'],
         role=config['role'],
-        model=Claude(id=config['model_id']),
+        model=Claude(id=config['model_id'], cache_system_prompt=True),
         description=config['description'],
         instructions=config['instructions'],
         markdown=config['settings']['markdown']
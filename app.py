@@ -3,27 +3,111 @@ PROCBOT Web Application
 Clean web UI for the procurement assistant
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from agents.coordinator_agent import create_coordinator_agent
 from utils.state_manager import ProjectStateManager
 from utils.project_tools import ProjectTools
-from dotenv import load_dotenv
+from utils.env import ensure_env
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+import logging
 import os
 import uuid
 from datetime import datetime
 
-load_dotenv()
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ensure_env()
+
+logger = logging.getLogger(__name__)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
 CORS(app)
 
-# Initialize components
-coordinator = create_coordinator_agent()
+# orjson is optional; without it Flask's stdlib json provider is used
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
+# Number of coordinator runs to race per chat message (1 = no racing).
+# Each extra run is a full billed Claude call, so this is off by default.
+SPECULATIVE_RUNS = max(1, int(os.getenv('PROCBOT_SPECULATIVE_RUNS', '1')))
+
+# Request threads per worker, as configured for Gunicorn in gunicorn_conf.py
+REQUEST_THREADS = int(os.getenv('PROCBOT_THREADS', '8'))
+
+# Initialize components. Losing runs can't be cancelled, so every request
+# thread needs room for all its racers or new races queue behind old losers
+speculative_executor = ThreadPoolExecutor(max_workers=REQUEST_THREADS * SPECULATIVE_RUNS) if SPECULATIVE_RUNS > 1 else None
 state_manager = ProjectStateManager()
 project_tools = ProjectTools()
 
+@lru_cache(maxsize=1)
+def get_coordinator():
+    """
+    Build the coordinator agent on first use
+    
+    Deferred so the agent stack (agno, Claude client) is only imported and
+    built once a chat request needs it, not for page or project requests.
+    """
+    from agents.coordinator_agent import create_coordinator_agent
+    return create_coordinator_agent()
+
+def run_coordinator(prompt):
+    """
+    Run the coordinator on a prompt
+    
+    With PROCBOT_SPECULATIVE_RUNS > 1 the prompt is sent to several
+    coordinators at once and the first successful response wins. Runs that
+    already started can't be interrupted; their results are discarded.
+    
+    Racers are built per call: an Agent keeps per-run state, and a losing
+    run may still be going when the next request arrives.
+    """
+    if speculative_executor is None:
+        return get_coordinator().run(prompt)
+    
+    from agents.coordinator_agent import create_coordinator_agent
+    racers = [create_coordinator_agent() for _ in range(SPECULATIVE_RUNS)]
+    futures = [speculative_executor.submit(agent.run, prompt) for agent in racers]
+    error = None
+    
+    for future in as_completed(futures):
+        try:
+            response = future.result()
+        except Exception as e:
+            error = e
+            continue
+        
+        for other in futures:
+            other.cancel()
+        return response
+    
+    raise error
+
+def response_text(response):
+    """Get the text of an agent response"""
+    text = getattr(response, 'content', None) or getattr(response, 'message', None)
+    if text:
+        return text
+    
+    # Unknown response type; str() may be slow, so make it visible
+    logger.debug("Falling back to str() for %s response", type(response).__name__)
+    return str(response)
+
 @app.route('/')
 def index():
     """Serve the main page"""
@@ -60,9 +144,10 @@ def create_project():
         project_id = state_manager.create_project(project_name)
         project = state_manager.load_project(project_id)
         
+        # Projects in API responses always include conversation_history
         return jsonify({
             'success': True,
-            'project': project
+            'project': project.load_history()
         })
     except Exception as e:
         return jsonify({
@@ -81,6 +166,9 @@ def get_project(project_id):
                 'error': 'Project not found'
             }), 404
         
+        # The project view shows the conversation, so read it in
+        project.load_history()
+        
         return jsonify({
             'success': True,
             'project': project
@@ -91,9 +179,52 @@ def get_project(project_id):
             'error': str(e)
         }), 500
 
+def sse_event(payload):
+    """Format a payload as a server-sent event"""
+    return f"data: {app.json.dumps(payload)}\n\n"
+
+def stream_chat_response(prompt, project_id, current_project):
+    """
+    Stream a coordinator response as server-sent events
+    
+    Emits {'delta': text} for each chunk, then {'done': True, 'project': ...}
+    once the full response has been saved, or {'error': ...} on failure.
+    The project includes its conversation history, reply included.
+    """
+    try:
+        chunks = []
+        for event in get_coordinator().run(prompt, stream=True):
+            text = getattr(event, 'content', None)
+            if isinstance(text, str) and text:
+                chunks.append(text)
+                yield sse_event({'delta': text})
+        
+        # Save agent response once complete
+        if project_id and current_project:
+            state_manager.add_message(
+                project_id,
+                'assistant',
+                ''.join(chunks),
+                'coordinator',
+                project=current_project
+            )
+        
+        if current_project:
+            current_project.load_history()
+        
+        yield sse_event({'done': True, 'project': current_project})
+    except Exception as e:
+        yield sse_event({'error': str(e)})
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    """Handle chat messages"""
+    """
+    Handle chat messages
+    
+    Send "stream": true to receive the response as server-sent events
+    instead of a single JSON body. Either way the returned project includes
+    its conversation history, with this exchange.
+    """
     try:
         data = request.json
         message = data.get('message')
@@ -116,42 +247,51 @@ def chat():
                 state_manager.add_message(
                     project_id,
                     'user',
-                    message
+                    message,
+                    project=current_project
                 )
                 
                 # Build context
-                context_info = f"\n\n[Current Project Context]"
-                context_info += f"\nProject: {current_project['project_name']}"
-                context_info += f"\nStage: {current_project['current_stage']}"
+                context_lines = [
+                    "[Current Project Context]",
+                    f"Project: {current_project['project_name']}",
+                    f"Stage: {current_project['current_stage']}"
+                ]
                 
                 if current_project['context']:
-                    context_info += "\nKnown Details:"
-                    for key, value in current_project['context'].items():
-                        context_info += f"\n  - {key}: {value}"
+                    context_lines.append("Known Details:")
+                    context_lines.extend(f"  - {key}: {value}" for key, value in current_project['context'].items())
                 
-                enriched_prompt = f"{message}{context_info}"
+                enriched_prompt = f"{message}\n\n" + "\n".join(context_lines)
+        
+        if data.get('stream'):
+            return Response(
+                stream_with_context(stream_chat_response(enriched_prompt, project_id, current_project)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
         # Get agent response
-        response = coordinator.run(enriched_prompt)
+        response = run_coordinator(enriched_prompt)
         
-        # Extract response text
-        if hasattr(response, 'content'):
-            response_text = response.content
-        else:
-            response_text = str(response)
+        text = response_text(response)
         
         # Save agent response if we have a project
         if project_id and current_project:
             state_manager.add_message(
                 project_id,
                 'assistant',
-                response_text,
-                'coordinator'
+                text,
+                'coordinator',
+                project=current_project
             )
         
+        if current_project:
+            current_project.load_history()
+        
         return jsonify({
             'success': True,
-            'response': response_text,
+            'response': text,
             'project': current_project
         })
         
@@ -2,12 +2,17 @@
 PROCBOT Chat with Multi-Agent Team and Full Workflow Management
 """
 
-from utils.agent_team import ProcurementAgentTeam
+from utils.agent_team import ProcurementAgentTeam, claude_model
 from utils.project_tools import ProjectTools
+from utils.router import route
 from agno.tools import tool
-from dotenv import load_dotenv
+from utils.env import ensure_env
+from functools import lru_cache
+from typing import Optional
+import asyncio
+import sys
 
-load_dotenv()
+ensure_env()
 
 # Create global instances
 project_tools = ProjectTools()
@@ -78,7 +83,7 @@ def manage_project_workflow(action: str, reason: str = "", target_stage: str = "
 
 # Specialist agent tools
 @tool
-def consult_business_requirements_specialist(query: str) -> str:
+def consult_business_requirements_specialist(query: str, no_cache: bool = False) -> str:
     """
     Consult the Business Requirements Analyst for help with:
     - Gathering and documenting requirements
@@ -88,11 +93,12 @@ def consult_business_requirements_specialist(query: str) -> str:
     
     Args:
         query: The question or task for the specialist
+        no_cache: Set to true to get a fresh answer, e.g. after project context changed
     """
-    return agent_team.consult_business_requirements_specialist(query)
+    return agent_team.consult_business_requirements_specialist(query, no_cache)
 
 @tool
-def consult_market_research_specialist(query: str) -> str:
+def consult_market_research_specialist(query: str, no_cache: bool = False) -> str:
     """
     Consult the Market Research Analyst for help with:
     - Analyzing market trends and solutions
@@ -102,11 +108,12 @@ def consult_market_research_specialist(query: str) -> str:
     
     Args:
         query: The question or task for the specialist
+        no_cache: Set to true to get a fresh answer, e.g. after project context changed
     """
-    return agent_team.consult_market_research_specialist(query)
+    return agent_team.consult_market_research_specialist(query, no_cache)
 
 @tool
-def consult_rfi_rfp_specialist(query: str) -> str:
+def consult_rfi_rfp_specialist(query: str, no_cache: bool = False) -> str:
     """
     Consult the RFI/RFP Specialist for help with:
     - Creating RFI/RFP documents
@@ -115,11 +122,12 @@ def consult_rfi_rfp_specialist(query: str) -> str:
     
     Args:
         query: The question or task for the specialist
+        no_cache: Set to true to get a fresh answer, e.g. after project context changed
     """
-    return agent_team.consult_rfi_rfp_specialist(query)
+    return agent_team.consult_rfi_rfp_specialist(query, no_cache)
 
 @tool
-def consult_evaluation_specialist(query: str) -> str:
+def consult_evaluation_specialist(query: str, no_cache: bool = False) -> str:
     """
     Consult the Vendor Evaluation Specialist for help with:
     - Creating evaluation frameworks
@@ -129,11 +137,12 @@ def consult_evaluation_specialist(query: str) -> str:
     
     Args:
         query: The question or task for the specialist
+        no_cache: Set to true to get a fresh answer, e.g. after project context changed
     """
-    return agent_team.consult_evaluation_specialist(query)
+    return agent_team.consult_evaluation_specialist(query, no_cache)
 
 @tool
-def consult_summary_specialist(query: str) -> str:
+def consult_summary_specialist(query: str, no_cache: bool = False) -> str:
     """
     Consult the Executive Summary Writer for help with:
     - Creating executive summaries
@@ -142,22 +151,32 @@ def consult_summary_specialist(query: str) -> str:
     
     Args:
         query: The question or task for the specialist
+        no_cache: Set to true to get a fresh answer, e.g. after project context changed
     """
-    return agent_team.consult_summary_specialist(query)
+    return agent_team.consult_summary_specialist(query, no_cache)
 
-def create_full_coordinator():
-    """Create coordinator with ALL capabilities"""
-    from agno.agent import Agent
-    from agno.models.anthropic import Claude
-    from utils.config_loader import load_agent_config
+@tool
+def consult_many(requests: list[dict]) -> str:
+    """
+    Consult several specialists at the same time.
+    Prefer this over separate consult_* calls when two or more specialists
+    are needed for independent parts of a request.
     
-    config = load_agent_config('coordinator')
+    Args:
+        requests: List of {"specialist": ..., "query": ...} items. specialist is one of
+            business_requirements, market_research, rfi_rfp, evaluation, summary
+    """
+    try:
+        answers = asyncio.run(agent_team.consult_many(
+            [(item['specialist'], item['query']) for item in requests]
+        ))
+    except (KeyError, TypeError) as e:
+        return f"Invalid consult_many request: {e}"
     
-    agent = Agent(
-        name=config['name'],
-        role=config['role'],
-        model=Claude(id=config['model_id']),
-        description=config['description'] + """
+    return "\n\n".join(f"## {specialist}\n\n{answer}" for specialist, answer in answers.items())
+
+# Coordinator description, instructions and tools on top of the YAML config; built once
+_EXTRA_DESCRIPTION = """
         
         You manage procurement projects AND coordinate specialist consultants:
         
@@ -174,118 +193,153 @@ def create_full_coordinator():
         - Executive Summary Writer
         
         Use tools to take action, consult specialists for expertise.
-        """,
-        instructions=config['instructions'] + [
-            "You have comprehensive project management capabilities",
-            "Use manage_project_workflow to cancel, pause, resume, complete projects",
-            "Use manage_project_workflow to advance, revert, or jump between stages",
-            "Consult specialists when expertise is needed",
-            "For general guidance, answer directly"
-        ],
-        tools=[
-            list_all_projects, 
-            create_new_project, 
-            load_project, 
-            get_project_status, 
-            add_context,
-            manage_project_workflow,  # NEW WORKFLOW TOOL!
-            consult_business_requirements_specialist,
-            consult_market_research_specialist,
-            consult_rfi_rfp_specialist,
-            consult_evaluation_specialist,
-            consult_summary_specialist
-        ],
+        """
+
+_EXTRA_INSTRUCTIONS = (
+    "You have comprehensive project management capabilities",
+    "Use manage_project_workflow to cancel, pause, resume, complete projects",
+    "Use manage_project_workflow to advance, revert, or jump between stages",
+    "Consult specialists when expertise is needed",
+    "When two or more specialists are needed for independent work, use consult_many to consult them at once",
+    "For general guidance, answer directly"
+)
+
+_TOOLS = (
+    list_all_projects,
+    create_new_project,
+    load_project,
+    get_project_status,
+    add_context,
+    manage_project_workflow,
+    consult_business_requirements_specialist,
+    consult_market_research_specialist,
+    consult_rfi_rfp_specialist,
+    consult_evaluation_specialist,
+    consult_summary_specialist,
+    consult_many
+)
+
+@lru_cache(maxsize=1)
+def create_full_coordinator():
+    """Create coordinator with ALL capabilities (built once, then shared)"""
+    from agno.agent import Agent
+    from utils.config_loader import load_agent_config
+    
+    config = load_agent_config('coordinator')
+    
+    agent = Agent(
+        name=config['name'],
+        role=config['role'],
+        model=claude_model(config['model_id']),
+        description=config['description'] + _EXTRA_DESCRIPTION,
+        instructions=[*config['instructions'], *_EXTRA_INSTRUCTIONS],
+        tools=list(_TOOLS),
         markdown=config['settings']['markdown']
     )
     
     return agent
 
+_RULE = "=" * 70
+
+_WELCOME = f"""
+{_RULE}
+  PROCBOT - AI-Powered Procurement Assistant
+{_RULE}
+
+Hello! I coordinate a team of procurement specialists and manage
+your project lifecycle.
+
+I can help you:
+  • Create and track procurement projects
+  • Consult specialist agents for expert advice
+  • Manage project workflow (cancel, pause, resume, complete)
+  • Guide you through procurement stages
+
+Just talk naturally - I'll figure out what you need.
+
+Type 'exit', 'quit', or 'bye' to end.
+{_RULE}
+"""
+
+_FAREWELL = "\n👋 Thank you for using PROCBOT! Goodbye!\n\n"
+_INTERRUPTED = "\n\n👋 Goodbye!\n\n"
+
 class ProcbotChat:
     """Complete PROCBOT chat"""
     
-    def __init__(self):
-        self.coordinator = create_full_coordinator()
+    def __init__(self, coordinator=None):
+        self.coordinator = coordinator or create_full_coordinator()
         self.project_tools = project_tools
     
     def display_welcome(self):
         """Display welcome message"""
-        print("\n" + "=" * 70)
-        print("  PROCBOT - AI-Powered Procurement Assistant")
-        print("=" * 70)
-        print("\nHello! I coordinate a team of procurement specialists and manage")
-        print("your project lifecycle.")
-        print("\nI can help you:")
-        print("  • Create and track procurement projects")
-        print("  • Consult specialist agents for expert advice")
-        print("  • Manage project workflow (cancel, pause, resume, complete)")
-        print("  • Guide you through procurement stages")
-        print("\nJust talk naturally - I'll figure out what you need.")
-        print("\nType 'exit', 'quit', or 'bye' to end.")
-        print("=" * 70)
+        sys.stdout.write(_WELCOME)
     
-    def chat(self, user_message: str):
-        """Have a conversation"""
-        
-        # Save user message
-        self.project_tools.save_conversation('user', user_message)
-        
-        # Build context
-        current_project = self.project_tools.get_current_project()
-        enriched_prompt = user_message
-        
-        if current_project:
-            context_info = f"\n\n[Current Project Context]"
-            context_info += f"\nProject: {current_project['project_name']}"
-            context_info += f"\nStage: {current_project['current_stage']}"
-            context_info += f"\nStatus: {current_project['status']}"
-            
-            if current_project['context']:
-                context_info += "\nKnown Details:"
-                for key, value in current_project['context'].items():
-                    context_info += f"\n  - {key}: {value}"
-            
-            enriched_prompt = f"{user_message}{context_info}"
-        
-        # Get response
-        print("\n🤖 PROCBOT: ", end="", flush=True)
+    def chat(self, user_message: str) -> Optional[dict]:
+        """Have a conversation; returns the current project after the turn"""
         
-        try:
-            response = self.coordinator.run(enriched_prompt)
+        # Project saves made during the turn (tools, history) are written once at the end
+        with self.project_tools.batch():
+            # Save user message; written together with the reply
+            self.project_tools.save_conversation('user', user_message)
             
-            if hasattr(response, 'content'):
-                full_response = response.content
-                print(full_response)
-            else:
-                full_response = str(response)
-                print(full_response)
+            # Add the current project's context (cached until it changes)
+            enriched_prompt = user_message + self.project_tools.get_context_blob()
             
-            print()
+            # Get response
+            print("\n🤖 PROCBOT: ", end="", flush=True)
             
-            # Save response
-            self.project_tools.save_conversation('agent', full_response, 'coordinator')
+            try:
+                # Obvious specialist requests skip the coordinator round trip;
+                # only specialists with a config can be consulted directly
+                specialist = route(user_message, agent_team.available_specialists())
+                if specialist:
+                    response = self._consult_directly(specialist, enriched_prompt)
+                    if response:
+                        print(f"{response}\n")
+                        
+                        self.project_tools.save_conversation('agent', response, specialist)
+                        return self.project_tools.get_current_project()
+                
+                # Print chunks as they arrive instead of waiting for the full reply
+                chunks = []
+                for event in self.coordinator.run(enriched_prompt, stream=True):
+                    text = getattr(event, 'content', None)
+                    if isinstance(text, str) and text:
+                        print(text, end="", flush=True)
+                        chunks.append(text)
+                
+                full_response = "".join(chunks)
+                print("\n")
+                
+                # Save response
+                self.project_tools.save_conversation('agent', full_response, 'coordinator')
+                
+            except Exception as e:
+                print(f"\nError: {e}")
+                import traceback
+                traceback.print_exc()
             
-        except Exception as e:
-            print(f"\nError: {e}")
-            import traceback
-            traceback.print_exc()
+            return self.project_tools.get_current_project()
+    
+    def _consult_directly(self, specialist: str, prompt: str) -> str:
+        """Consult a routed specialist; returns None if it fails so the coordinator can answer instead"""
+        try:
+            return getattr(agent_team, f"consult_{specialist}_specialist")(prompt)
+        except Exception:
+            return None
     
     def run(self):
         """Run the chat interface"""
         self.display_welcome()
         
+        # Updated from each turn's result rather than looked up again
+        current_project = self.project_tools.get_current_project()
+        
         while True:
             try:
-                current_project = self.project_tools.get_current_project()
-                if current_project:
-                    project_name = current_project['project_name']
-                    status = current_project['status']
-                    
-                    # Show status indicator
-                    status_emoji = "🟢" if status == 'active' else "⏸️" if status == 'on_hold' else "🔴" if status == 'cancelled' else "✅"
-                    
-                    indicator = f"[{status_emoji} {project_name[:25]}] " if len(project_name) <= 25 else f"[{status_emoji} {project_name[:22]}...] "
-                else:
-                    indicator = ""
+                # Show status indicator
+                indicator = self.project_tools.get_prompt_indicator() if current_project else ""
                 
                 user_input = input(f"\n{indicator}You: ").strip()
                 
@@ -293,13 +347,13 @@ class ProcbotChat:
                     continue
                 
                 if user_input.lower() in ['exit', 'quit', 'bye', 'goodbye']:
-                    print("\n👋 Thank you for using PROCBOT! Goodbye!\n")
+                    sys.stdout.write(_FAREWELL)
                     break
                 
-                self.chat(user_input)
+                current_project = self.chat(user_input)
                 
             except KeyboardInterrupt:
-                print("\n\n👋 Goodbye!\n")
+                sys.stdout.write(_INTERRUPTED)
                 break
             except Exception as e:
                 print(f"\n❌ Error: {e}")
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for the PROCBOT web app
+
+Run with:
+    gunicorn -c gunicorn_conf.py app:app
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('PROCBOT_BIND', '0.0.0.0:5000')
+
+# Threaded workers: requests spend most of their time waiting on Claude
+workers = int(os.getenv('PROCBOT_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('PROCBOT_THREADS', 8))
+
+# Chat requests wait on full LLM runs; don't kill workers mid-response
+timeout = 300
+
+# Import the app (config, YAML, state manager) once in the master and fork
+preload_app = True
+
+def when_ready(server):
+    """Build the coordinator in the master so workers inherit it via fork"""
+    import app
+    app.get_coordinator()
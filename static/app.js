@@ -189,29 +189,66 @@ async function sendMessage() {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 message: message,
-                project_id: currentProjectId
+                project_id: currentProjectId,
+                stream: true
             })
         });
         
-        const data = await response.json();
+        // Validation errors still come back as plain JSON
+        if (!(response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+            const data = await response.json();
+            hideTypingIndicator();
+            addMessage('assistant', 'Sorry, I encountered an error: ' + data.error);
+            return;
+        }
         
+        await readChatStream(response);
+    } catch (error) {
         hideTypingIndicator();
+        console.error('Error sending message:', error);
+        addMessage('assistant', 'Sorry, I encountered a network error. Please try again.');
+    }
+}
+
+async function readChatStream(response) {
+    // Render server-sent events from /api/chat as they arrive
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let messageText = null;
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
         
-        if (data.success) {
-            addMessage('assistant', data.response);
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        
+        for (const event of events) {
+            if (!event.startsWith('data: ')) continue;
+            const data = JSON.parse(event.slice(6));
             
-            // Update project stage if changed
-            if (data.project) {
+            if (data.delta) {
+                if (!messageText) {
+                    hideTypingIndicator();
+                    messageText = addMessage('assistant', '');
+                }
+                text += data.delta;
+                messageText.textContent = text;
+                scrollToBottom();
+            } else if (data.error) {
+                hideTypingIndicator();
+                addMessage('assistant', 'Sorry, I encountered an error: ' + data.error);
+            } else if (data.done && data.project) {
+                // Update project stage if changed
                 document.getElementById('currentProjectStage').textContent = `Stage: ${formatStage(data.project.current_stage)}`;
             }
-        } else {
-            addMessage('assistant', 'Sorry, I encountered an error: ' + data.error);
         }
-    } catch (error) {
-        hideTypingIndicator();
-        console.error('Error sending message:', error);
-        addMessage('assistant', 'Sorry, I encountered a network error. Please try again.');
     }
+    
+    hideTypingIndicator();
 }
 
 function addMessage(role, content, animate = true) {
@@ -228,6 +265,8 @@ function addMessage(role, content, animate = true) {
     
     messagesContainer.appendChild(messageDiv);
     scrollToBottom();
+    
+    return messageDiv.querySelector('.whitespace-pre-wrap');
 }
 
 function showTypingIndicator() {
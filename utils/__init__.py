@@ -0,0 +1,4 @@
+"""
+PROCBOT utilities
+Configuration loading, project state and agent team helpers
+"""
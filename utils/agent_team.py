@@ -3,53 +3,182 @@ Multi-Agent Team with Intelligent Routing
 Coordinator uses tools to delegate to specialist agents
 """
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable
 
+import httpx
 from agno.agent import Agent
 from agno.tools import tool
 from agno.models.anthropic import Claude
-from utils.config_loader import load_agent_config
+from utils.config_loader import get_all_agent_configs, load_agent_config
+
+try:
+    import h2  # noqa: F401 - httpx needs it for HTTP/2
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+# One connection pool for every Claude model instead of one per agent, so
+# the coordinator and specialists share TLS sessions (and HTTP/2 streams).
+# Specialist answers can take minutes, so only the connect timeout is short.
+_SHARED_HTTP = httpx.Client(
+    http2=_HTTP2,
+    timeout=httpx.Timeout(600.0, connect=10.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+)
+
+def claude_model(model_id: str) -> Claude:
+    """Create a Claude model that uses the shared HTTP client"""
+    return Claude(
+        id=model_id,
+        cache_system_prompt=True,
+        client_params={'http_client': _SHARED_HTTP}
+    )
+
+class _ResponseCache:
+    """Bounded LRU cache of specialist answers, keyed by normalized query"""
+    
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(agent_type: str, query: str) -> tuple:
+        # Case and whitespace differences shouldn't cost another LLM call
+        normalized = " ".join(query.lower().split())
+        return agent_type, hashlib.sha1(normalized.encode()).hexdigest()
+    
+    def get(self, agent_type: str, query: str):
+        key = self._key(agent_type, query)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+    
+    def put(self, agent_type: str, query: str, content: str):
+        key = self._key(agent_type, query)
+        with self._lock:
+            self._entries[key] = content
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+def cached_consult(agent_type: str):
+    """Serve repeated consultations of a specialist from the team's response cache"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, query: str, no_cache: bool = False) -> str:
+            if not no_cache:
+                cached = self._response_cache.get(agent_type, query)
+                if cached is not None:
+                    return cached
+            
+            content = method(self, query, no_cache)
+            
+            # Empty replies are usually failed runs; ask again next time
+            if content:
+                self._response_cache.put(agent_type, query, content)
+            return content
+        return wrapper
+    return decorator
+
+async def consult_in_parallel(requests: list[tuple[str, str]], consult: Callable[[str, str], str]) -> dict:
+    """
+    Run consultations concurrently, one thread per specialist
+    
+    Several queries for the same specialist run one after another, since an
+    agent handles one run at a time. A specialist that fails gets an error
+    message as its answer, so the other answers are still returned.
+    
+    Args:
+        requests: (specialist, query) pairs
+        consult: Called as consult(specialist, query) to get one answer
+    
+    Returns:
+        Dictionary of specialist -> answer (answers to repeated
+        specialists are joined)
+    """
+    queries_by_specialist = {}
+    for specialist, query in requests:
+        queries_by_specialist.setdefault(specialist, []).append(query)
+    
+    def consult_all(specialist):
+        return "\n\n".join(consult(specialist, query) for query in queries_by_specialist[specialist])
+    
+    results = await asyncio.gather(*(
+        asyncio.to_thread(consult_all, specialist) for specialist in queries_by_specialist
+    ), return_exceptions=True)
+    
+    return {
+        specialist: f"❌ Consultation failed: {result}" if isinstance(result, Exception) else result
+        for specialist, result in zip(queries_by_specialist, results)
+    }
 
 class ProcurementAgentTeam:
     """Team of specialist agents with intelligent AI-powered routing"""
     
+    AGENT_TYPES = (
+        'business_requirements',
+        'market_research',
+        'rfi_rfp',
+        'evaluation',
+        'summary'
+    )
+    
+    # Config sections of the specialists whose YAML key differs from their type
+    CONFIG_KEYS = {
+        'evaluation': 'vendor_evaluation',
+        'summary': 'executive_summary'
+    }
+    
     def __init__(self):
-        self.agents = self._create_all_agents()
+        # Specialists are created on first consultation, see _get_agent
+        self._agent_cache = {}
+        self._agent_lock = threading.Lock()
+        self._response_cache = _ResponseCache()
         self._setup_tools()
     
-    def _create_all_agents(self):
-        """Create all specialist agents"""
-        agents = {}
+    def _get_agent(self, agent_type: str) -> Agent:
+        """Get a specialist agent, creating it on first use"""
+        agent = self._agent_cache.get(agent_type)
+        if agent is not None:
+            return agent
         
-        agent_types = [
-            'business_requirements',
-            'market_research', 
-            'rfi_rfp',
-            'evaluation',
-            'summary'
-        ]
-        
-        for agent_type in agent_types:
-            config = load_agent_config(agent_type)
-            agents[agent_type] = Agent(
-                name=config['name'],
-                role=config['role'],
-                model=Claude(id=config['model_id']),
-                description=config['description'],
-                instructions=config['instructions'],
-                markdown=config['settings']['markdown']
-            )
+        config = load_agent_config(self.CONFIG_KEYS.get(agent_type, agent_type))
+        agent = Agent(
+            name=config['name'],
+            role=config['role'],
+            model=claude_model(config['model_id']),
+            description=config['description'],
+            instructions=config['instructions'],
+            markdown=config['settings']['markdown']
+        )
         
-        return agents
+        # Parallel consultations may race to create the same agent
+        with self._agent_lock:
+            return self._agent_cache.setdefault(agent_type, agent)
+    
+    def available_specialists(self) -> tuple:
+        """Get the specialist types that have a section in the agent config"""
+        configs = get_all_agent_configs()
+        return tuple(
+            agent_type for agent_type in self.AGENT_TYPES
+            if self.CONFIG_KEYS.get(agent_type, agent_type) in configs
+        )
     
     def _setup_tools(self):
         """Set up tools for coordinator to call specialists"""
         # We'll define these as instance methods, then convert to tools
         pass
     
-    def consult_business_requirements_specialist(self, query: str) -> str:
+    @cached_consult('business_requirements')
+    def consult_business_requirements_specialist(self, query: str, no_cache: bool = False) -> str:
         """
         Consult the Business Requirements Analyst for help with:
         - Gathering and documenting requirements
@@ -59,11 +188,13 @@ class ProcurementAgentTeam:
         
         Args:
             query: The question or task for the specialist
+            no_cache: Set to true to get a fresh answer, e.g. after project context changed
         """
-        response = self.agents['business_requirements'].run(query)
-        return response.content
+        response = self._get_agent('business_requirements').run(query)
+        return getattr(response, 'content', '')
     
-    def consult_market_research_specialist(self, query: str) -> str:
+    @cached_consult('market_research')
+    def consult_market_research_specialist(self, query: str, no_cache: bool = False) -> str:
         """
         Consult the Market Research Analyst for help with:
         - Analyzing market trends and solutions
@@ -73,11 +204,13 @@ class ProcurementAgentTeam:
         
         Args:
             query: The question or task for the specialist
+            no_cache: Set to true to get a fresh answer, e.g. after project context changed
         """
-        response = self.agents['market_research'].run(query)
-        return response.content
+        response = self._get_agent('market_research').run(query)
+        return getattr(response, 'content', '')
     
-    def consult_rfi_rfp_specialist(self, query: str) -> str:
+    @cached_consult('rfi_rfp')
+    def consult_rfi_rfp_specialist(self, query: str, no_cache: bool = False) -> str:
         """
         Consult the RFI/RFP Specialist for help with:
         - Creating RFI (Request for Information) documents
@@ -87,11 +220,13 @@ class ProcurementAgentTeam:
         
         Args:
             query: The question or task for the specialist
+            no_cache: Set to true to get a fresh answer, e.g. after project context changed
         """
-        response = self.agents['rfi_rfp'].run(query)
-        return response.content
+        response = self._get_agent('rfi_rfp').run(query)
+        return getattr(response, 'content', '')
     
-    def consult_evaluation_specialist(self, query: str) -> str:
+    @cached_consult('evaluation')
+    def consult_evaluation_specialist(self, query: str, no_cache: bool = False) -> str:
         """
         Consult the Vendor Evaluation Specialist for help with:
         - Creating evaluation frameworks and scorecards
@@ -101,11 +236,13 @@ class ProcurementAgentTeam:
         
         Args:
             query: The question or task for the specialist
+            no_cache: Set to true to get a fresh answer, e.g. after project context changed
         """
-        response = self.agents['evaluation'].run(query)
-        return response.content
+        response = self._get_agent('evaluation').run(query)
+        return getattr(response, 'content', '')
     
-    def consult_summary_specialist(self, query: str) -> str:
+    @cached_consult('summary')
+    def consult_summary_specialist(self, query: str, no_cache: bool = False) -> str:
         """
         Consult the Executive Summary Writer for help with:
         - Creating executive summaries
@@ -115,9 +252,39 @@ class ProcurementAgentTeam:
         
         Args:
             query: The question or task for the specialist
+            no_cache: Set to true to get a fresh answer, e.g. after project context changed
         """
-        response = self.agents['summary'].run(query)
-        return response.content
+        response = self._get_agent('summary').run(query)
+        return getattr(response, 'content', '')
+    
+    async def consult_many(self, requests: list[tuple[str, str]]) -> dict:
+        """
+        Consult several specialists concurrently, see consult_in_parallel.
+        
+        A specialist that is unknown or fails gets an error message as its
+        answer, so the other answers are still returned.
+        
+        Args:
+            requests: (specialist, query) pairs, where specialist is one of
+                business_requirements, market_research, rfi_rfp, evaluation, summary
+        
+        Returns:
+            Dictionary of specialist -> answer (answers to repeated
+            specialists are joined)
+        """
+        available = self.available_specialists()
+        answers = {}
+        known = []
+        for specialist, query in requests:
+            if specialist not in available:
+                answers[specialist] = f"❌ Unknown specialist '{specialist}'. Available: {', '.join(available)}"
+                continue
+            known.append((specialist, query))
+        
+        answers.update(await consult_in_parallel(
+            known, lambda specialist, query: getattr(self, f"consult_{specialist}_specialist")(query)
+        ))
+        return answers
     
     def create_coordinator_with_specialists(self):
         """
@@ -137,7 +304,7 @@ class ProcurementAgentTeam:
         coordinator = Agent(
             name=coord_config['name'],
             role=coord_config['role'],
-            model=Claude(id=coord_config['model_id']),
+            model=claude_model(coord_config['model_id']),
             description=coord_config['description'] + """
             
             You have access to a team of specialist consultants via tools:
@@ -169,8 +336,8 @@ class ProcurementAgentTeam:
 
 # Test
 if __name__ == "__main__":
-    from dotenv import load_dotenv
-    load_dotenv()
+    from utils.env import ensure_env
+    ensure_env()
     
     print("Creating Intelligent Agent Team...")
     team = ProcurementAgentTeam()
@@ -4,7 +4,61 @@ Loads agent configurations from YAML files
 """
 
 import yaml
+import json
 import os
+from functools import lru_cache
+from utils.serialization import write_atomic
+
+# Prefer the libyaml C loader when PyYAML was built with it
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+CONFIG_PATH = os.path.join('config', 'agent_config.yaml')
+
+def read_yaml(config_path):
+    """
+    Read a YAML file, going through a JSON sidecar cache
+    
+    The parsed YAML is written next to the source as `<name>.yaml.json`.
+    While the sidecar is at least as new as the YAML it is loaded with
+    json instead, which is much cheaper than re-parsing the YAML.
+    
+    Args:
+        config_path: Path to the YAML file
+    
+    Returns:
+        The parsed document
+    """
+    cache_path = f"{config_path}.json"
+    
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(config_path):
+            with open(cache_path, 'rb') as file:
+                return json.loads(file.read())
+    except (OSError, ValueError):
+        pass
+    
+    with open(config_path, 'r') as file:
+        data = yaml.load(file, Loader=YAML_LOADER)
+    
+    # Written atomically so a concurrent reader never sees a partial sidecar.
+    # A read-only checkout (OSError) or non-JSON YAML values such as dates
+    # (TypeError, ValueError) just skip the cache
+    try:
+        write_atomic(cache_path, json.dumps(data).encode('utf-8'))
+    except (OSError, TypeError, ValueError):
+        pass
+    
+    return data
+
+@lru_cache(maxsize=1)
+def _load_all(config_path, mtime):
+    """
+    Parse the full agent config file
+    
+    Cached per (path, mtime) so repeated agent creation reuses one parse,
+    while edits to the YAML are still picked up.
+    """
+    return read_yaml(config_path)
 
 def load_agent_config(agent_name):
     """
@@ -16,10 +70,7 @@ def load_agent_config(agent_name):
     Returns:
         Dictionary with agent configuration
     """
-    config_path = os.path.join('config', 'agent_config.yaml')
-    
-    with open(config_path, 'r') as file:
-        all_configs = yaml.safe_load(file)
+    all_configs = get_all_agent_configs()
     
     if agent_name not in all_configs:
         raise ValueError(f"Configuration for agent '{agent_name}' not found")
@@ -33,7 +84,6 @@ def get_all_agent_configs():
     Returns:
         Dictionary with all agent configurations
     """
-    config_path = os.path.join('config', 'agent_config.yaml')
-    
-    with open(config_path, 'r') as file:
-        return yaml.safe_load(file)
+    # Key on the resolved path so a cwd change can't return the wrong file
+    config_path = os.path.abspath(CONFIG_PATH)
+    return _load_all(config_path, os.path.getmtime(config_path))
@@ -0,0 +1,19 @@
+"""
+Environment Loader
+Loads the .env file once per process
+"""
+
+from dotenv import load_dotenv
+
+_LOADED = False
+
+def ensure_env():
+    """
+    Load environment variables from .env
+    
+    Safe to call from every module: the file is only read on the first call.
+    """
+    global _LOADED
+    if not _LOADED:
+        load_dotenv()
+        _LOADED = True
@@ -0,0 +1,154 @@
+"""
+Project Index
+Keeps the fields shown in project listings in one index.json file, so
+listing projects doesn't parse every project's full history
+"""
+
+import os
+import threading
+from pathlib import Path
+from utils.serialization import dumps, loads, write_atomic
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+INDEX_FILE = "index.json"
+
+# ijson events carrying a scalar value
+_SCALAR_EVENTS = {'string', 'number', 'boolean', 'null'}
+
+def scan_projects(data_dir, exclude: tuple = ()) -> dict:
+    """
+    Find the project files in a state directory
+    
+    Args:
+        data_dir: State directory to scan
+        exclude: Names of other .json files in the directory to skip
+    
+    Returns:
+        Dictionary of project id -> mtime of its file (ns)
+    """
+    project_mtimes = {}
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.endswith('.json') or name == INDEX_FILE or name in exclude:
+                continue
+            if entry.is_file():
+                project_mtimes[name[:-5]] = entry.stat().st_mtime_ns
+    
+    return project_mtimes
+
+class ProjectIndex:
+    """
+    Listing fields of every project in a state directory, keyed by project id
+    
+    fields must include updated_at, which listings are sorted by.
+    """
+    
+    def __init__(self, data_dir, fields: tuple):
+        self.data_dir = Path(data_dir)
+        self.index_file = self.data_dir / INDEX_FILE
+        self.fields = fields
+        self._entries = None
+        self._unsaved = False
+        # summaries() result and the project mtimes it was built from
+        self._summaries = None
+        self._summaries_key = None
+        self._lock = threading.Lock()
+    
+    def update(self, project_data: dict, mtime: int):
+        """
+        Record a project that was just written
+        
+        Only the in-memory index changes; the file is rewritten by the next
+        listing, so saves don't pay for a second write.
+        """
+        with self._lock:
+            self._load()[project_data["project_id"]] = self._entry(project_data, mtime)
+            self._unsaved = True
+            self._summaries_key = None
+    
+    def summaries(self, project_mtimes: dict) -> list:
+        """
+        Get the listing fields of every project
+        
+        Entries are checked against the files' current mtimes. Projects that
+        are missing from the index or were written since (e.g. by another
+        process) are re-read, so the index never needs rebuilding by hand.
+        While no project file has changed the last result is reused.
+        
+        Args:
+            project_mtimes: project id -> mtime of its file, for every project file
+        
+        Returns:
+            List of dicts with the index fields, most recently updated first
+        """
+        with self._lock:
+            if project_mtimes == self._summaries_key:
+                return list(self._summaries)
+            
+            entries = self._load()
+            
+            for project_id, mtime in project_mtimes.items():
+                entry = entries.get(project_id)
+                if entry is None or entry["mtime"] != mtime:
+                    project_file = self.data_dir / f"{project_id}.json"
+                    entries[project_id] = self._entry(self._read_fields(project_file), mtime)
+                    self._unsaved = True
+            
+            for project_id in entries.keys() - project_mtimes.keys():
+                del entries[project_id]
+                self._unsaved = True
+            
+            if self._unsaved:
+                write_atomic(self.index_file, dumps(entries))
+                self._unsaved = False
+            
+            fields = self.fields
+            summaries = [{field: entry[field] for field in fields} for entry in entries.values()]
+            summaries.sort(key=lambda x: x["updated_at"], reverse=True)
+            
+            self._summaries = summaries
+            self._summaries_key = dict(project_mtimes)
+            return list(summaries)
+    
+    def _load(self) -> dict:
+        """Get the index entries, reading the index file on first use"""
+        if self._entries is None:
+            try:
+                self._entries = loads(self.index_file.read_bytes())
+            except (OSError, ValueError):
+                self._entries = {}
+        
+        return self._entries
+    
+    def _read_fields(self, project_file: Path) -> dict:
+        """
+        Read the index fields from a project file
+        
+        With ijson installed the file is stream-parsed and reading stops once
+        every field is found; they all come before the conversation history,
+        so that is never parsed. Otherwise the whole file is parsed.
+        """
+        if ijson is None:
+            return loads(project_file.read_bytes())
+        
+        wanted = set(self.fields)
+        found = {}
+        with open(project_file, 'rb') as f:
+            for prefix, event, value in ijson.parse(f):
+                if prefix in wanted and event in _SCALAR_EVENTS:
+                    found[prefix] = value
+                    if len(found) == len(wanted):
+                        break
+        
+        return found
+    
+    def _entry(self, project_data: dict, mtime: int) -> dict:
+        """Build the index entry of a project"""
+        entry = {field: project_data.get(field) for field in self.fields}
+        entry["mtime"] = mtime
+        return entry
@@ -3,10 +3,71 @@ Project State Management
 Handles creation, loading, and persistence of procurement projects
 """
 
-import json
+import atexit
 import os
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from utils.project_index import ProjectIndex, scan_projects
+from utils.serialization import dumps, loads, write_atomic
+
+# Conversation entries kept inline in the project file; older ones are
+# moved to an append-only {project_id}.history.jsonl archive
+MAX_HISTORY = 20
+
+# Status indicator shown next to project names
+STATUS_ICON = {
+    'active': '🟢',
+    'on_hold': '⏸️',
+    'cancelled': '🔴',
+    'completed': '✅'
+}
+
+# Procurement stages in workflow order, with their display names
+STAGE_FLOW = (
+    'business_case',
+    'market_research',
+    'rfi_rfp',
+    'evaluation',
+    'summary'
+)
+
+STAGE_INDEX = {stage: index for index, stage in enumerate(STAGE_FLOW)}
+
+STAGE_NAMES = {
+    'business_case': 'Business Case',
+    'market_research': 'Market Research',
+    'rfi_rfp': 'RFI/RFP Development',
+    'evaluation': 'Vendor Evaluation',
+    'summary': 'Executive Summary'
+}
+
+# manage_workflow replies for stage moves, by action
+STAGE_TRANSITION_MESSAGES = {
+    'advance': "➡️ Advanced to the next stage!\n\n**From:** {old}\n**To:** {new}\n\nThe project is now in the {new} phase.",
+    'revert': "⬅️ Reverted to previous stage.\n\n**From:** {old}\n**Back to:** {new}\n\nYou can now work on the {new} phase.",
+    'jump_to': "🎯 Jumped to {new}!\n\n**From:** {old}\n**To:** {new}\n\nThe project is now in the {new} phase."
+}
+
+@dataclass(slots=True)
+class ProjectSummary:
+    """The fields of a project shown in project listings"""
+    project_id: str
+    project_name: str
+    current_stage: str
+    status: str
+    updated_at: str
+    
+    @classmethod
+    def from_state(cls, project_state: dict) -> "ProjectSummary":
+        return cls(
+            project_state['project_id'],
+            project_state['project_name'],
+            project_state['current_stage'],
+            project_state['status'],
+            project_state['updated_at']
+        )
 
 class ProjectTools:
     """Manages project state and persistence"""
@@ -15,17 +76,35 @@ class ProjectTools:
         self.state_dir = Path(state_dir)
         self.state_dir.mkdir(exist_ok=True)
         self.current_project = None
+        # ((project_name, status), prompt indicator), rebuilt when either changes
+        self._meta_cache = None
+        # Project context appended to chat prompts, rebuilt when the project changes
+        self._context_blob = None
+        # Inside batch(): nesting depth, and project states waiting to be written
+        self._batch_depth = 0
+        self._batch_pending = {}
+        # Conversation entries trimmed from a project, appended to its archive
+        # by the write that drops them from the project file
+        self._archive_pending = {}
+        # Listing fields of every project, kept in index.json
+        self._index = ProjectIndex(self.state_dir, ProjectSummary.__slots__)
+        atexit.register(self.flush)
     
     def create_new_project(self, project_name: str, context: dict = None) -> str:
         """Create a new procurement project"""
         
-        project_id = f"proj_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Write saves held back by batch() before switching projects
+        self.flush()
+        
+        now = datetime.now()
+        now_iso = now.isoformat()
+        project_id = f"proj_{now.strftime('%Y%m%d_%H%M%S')}"
         
         project_state = {
             "project_id": project_id,
             "project_name": project_name,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
+            "created_at": now_iso,
+            "updated_at": now_iso,
             "current_stage": "business_case",
             "status": "active",
             "context": context or {},
@@ -36,6 +115,8 @@ class ProjectTools:
         }
         
         self.current_project = project_state
+        self._meta_cache = None
+        self._context_blob = None
         self._save_to_file(project_state)
         
         return f"✅ Created new project: {project_name}\n📋 Project ID: {project_id}\n📍 Stage: Business Case\n🟢 Status: Active"
@@ -43,51 +124,61 @@ class ProjectTools:
     def load_existing_project(self, project_id: str) -> str:
         """Load an existing project by ID"""
         
-        project_file = self.state_dir / f"{project_id}.json"
-        
-        if not project_file.exists():
-            return f"❌ Project {project_id} not found."
+        # A project saved earlier in a batch() block isn't on disk yet
+        project_state = self._batch_pending.get(project_id)
         
-        with open(project_file, 'r') as f:
-            project_state = json.load(f)
+        if project_state is None:
+            project_file = self.state_dir / f"{project_id}.json"
+            
+            if not project_file.exists():
+                return f"❌ Project {project_id} not found."
+            
+            project_state = loads(project_file.read_bytes())
         
+        self.flush()
         self.current_project = project_state
+        self._meta_cache = None
+        self._context_blob = None
         
         return f"✅ Loaded project: {project_state['project_name']}\n📋 ID: {project_id}\n📍 Stage: {project_state['current_stage']}\n🟢 Status: {project_state['status']}"
     
     def list_all_projects(self) -> str:
         """List all projects in the system"""
         
-        project_files = list(self.state_dir.glob("*.json"))
+        # Include projects created or changed earlier in a batch() block
+        self.flush()
         
-        if not project_files:
-            return "No projects found. Create a new project to get started!"
+        project_mtimes = scan_projects(self.state_dir)
         
-        projects = []
-        for file in project_files:
-            with open(file, 'r') as f:
-                project = json.load(f)
-                projects.append(project)
+        if not project_mtimes:
+            return "No projects found. Create a new project to get started!"
         
-        # Sort by updated_at
-        projects.sort(key=lambda x: x['updated_at'], reverse=True)
+        # Sorted by updated_at descending
+        projects = [ProjectSummary.from_state(summary) for summary in self._index.summaries(project_mtimes)]
         
-        output = "## Your Projects\n\n"
+        lines = ["## Your Projects", ""]
+        append = lines.append
+        active_count = 0
         
+        # One block per project, counting active ones on the way
         for i, proj in enumerate(projects, 1):
-            status_emoji = "🟢" if proj['status'] == 'active' else "⏸️" if proj['status'] == 'on_hold' else "🔴" if proj['status'] == 'cancelled' else "✅"
-            output += f"{i}. **{status_emoji} {proj['project_name']}**\n"
-            output += f"   - **ID:** {proj['project_id']}\n"
-            output += f"   - **Stage:** {proj['current_stage'].replace('_', ' ').title()}\n"
-            output += f"   - **Last Updated:** {proj['updated_at'][:10]}\n\n"
-        
-        active_count = sum(1 for p in projects if p['status'] == 'active')
-        output += f"All {len(projects)} project(s) currently in the system"
+            status = proj.status
+            if status == 'active':
+                active_count += 1
+            
+            append(
+                f"{i}. **{STATUS_ICON.get(status, '✅')} {proj.project_name}**\n"
+                f"   - **ID:** {proj.project_id}\n"
+                f"   - **Stage:** {proj.current_stage.replace('_', ' ').title()}\n"
+                f"   - **Last Updated:** {proj.updated_at[:10]}\n"
+            )
+        
+        summary = f"All {len(projects)} project(s) currently in the system"
         if active_count < len(projects):
-            output += f", {active_count} active"
-        output += "."
+            summary += f", {active_count} active"
+        lines.append(summary + ".")
         
-        return output
+        return "\n".join(lines)
     
     def get_project_status(self, project_id: str = None) -> str:
         """Get detailed status of a project"""
@@ -97,29 +188,33 @@ class ProjectTools:
         
         proj = self.current_project
         
-        output = f"# Project Status\n\n"
-        output += f"**Project:** {proj['project_name']}\n"
-        output += f"**ID:** {proj['project_id']}\n"
-        output += f"**Current Stage:** {proj['current_stage'].replace('_', ' ').title()}\n"
-        output += f"**Status:** {proj['status'].replace('_', ' ').title()}\n"
-        output += f"**Created:** {proj['created_at'][:10]}\n"
-        output += f"**Last Updated:** {proj['updated_at'][:10]}\n\n"
-        
-        if proj.get('context'):
-            output += "## Context\n"
-            for key, value in proj['context'].items():
-                output += f"- **{key.title()}:** {value}\n"
-            output += "\n"
-        
-        if proj.get('decisions'):
-            output += f"## Recent Decisions ({len(proj['decisions'])})\n"
-            for decision in proj['decisions'][-3:]:
-                output += f"- {decision.get('action', 'Unknown')}"
-                if decision.get('reason'):
-                    output += f": {decision['reason']}"
-                output += f" ({decision.get('timestamp', '')[:10]})\n"
-        
-        return output
+        lines = [
+            "# Project Status",
+            "",
+            f"**Project:** {proj['project_name']}",
+            f"**ID:** {proj['project_id']}",
+            f"**Current Stage:** {proj['current_stage'].replace('_', ' ').title()}",
+            f"**Status:** {proj['status'].replace('_', ' ').title()}",
+            f"**Created:** {proj['created_at'][:10]}",
+            f"**Last Updated:** {proj['updated_at'][:10]}",
+            ""
+        ]
+        
+        context = proj.get('context')
+        if context:
+            lines.append("## Context")
+            lines.extend(f"- **{key.title()}:** {value}" for key, value in context.items())
+            lines.append("")
+        
+        decisions = proj.get('decisions')
+        if decisions:
+            lines.append(f"## Recent Decisions ({len(decisions)})")
+            for decision in decisions[-3:]:
+                reason = decision.get('reason')
+                reason = f": {reason}" if reason else ""
+                lines.append(f"- {decision.get('action', 'Unknown')}{reason} ({decision.get('timestamp', '')[:10]})")
+        
+        return "\n".join(lines) + "\n"
     
     def add_project_context(self, key: str, value: str) -> str:
         """Add context metadata to current project"""
@@ -129,6 +224,7 @@ class ProjectTools:
         
         self.current_project['context'][key] = value
         self.current_project['updated_at'] = datetime.now().isoformat()
+        self._context_blob = None
         self._save_to_file(self.current_project)
         
         return f"✅ Added {key} = {value} to project context"
@@ -137,8 +233,76 @@ class ProjectTools:
         """Get the current project state"""
         return self.current_project
     
+    def get_current_project_meta(self) -> tuple:
+        """
+        Get (project_name, status) for the current project
+        
+        Cached until the project or its status changes. Returns None when no
+        project is loaded.
+        """
+        if not self.current_project:
+            return None
+        
+        return self._project_meta()[0]
+    
+    def get_prompt_indicator(self) -> str:
+        """
+        Get the chat prompt prefix for the current project, e.g. "[🟢 Name] "
+        
+        Cached like get_current_project_meta(). Returns "" when no project is
+        loaded.
+        """
+        if not self.current_project:
+            return ""
+        
+        return self._project_meta()[1]
+    
+    def _project_meta(self) -> tuple:
+        """Build or reuse ((project_name, status), indicator) of the current project"""
+        if self._meta_cache is None:
+            project_name = self.current_project['project_name']
+            status = self.current_project['status']
+            label = project_name if len(project_name) <= 25 else f"{project_name[:22]}..."
+            indicator = f"[{STATUS_ICON.get(status, '✅')} {label}] "
+            self._meta_cache = ((project_name, status), indicator)
+        
+        return self._meta_cache
+    
+    def get_context_blob(self) -> str:
+        """
+        Get the current project's context block for chat prompts
+        
+        Returns "" when no project is loaded, else the context lines preceded
+        by a blank line, ready to append to the user's message. Cached until
+        the project, its stage, status or context changes.
+        """
+        if not self.current_project:
+            return ""
+        
+        if self._context_blob is None:
+            proj = self.current_project
+            lines = [
+                "[Current Project Context]",
+                f"Project: {proj['project_name']}",
+                f"Stage: {proj['current_stage']}",
+                f"Status: {proj['status']}"
+            ]
+            
+            if proj['context']:
+                lines.append("Known Details:")
+                lines.extend(f"  - {key}: {value}" for key, value in proj['context'].items())
+            
+            self._context_blob = "\n\n" + "\n".join(lines)
+        
+        return self._context_blob
+    
     def save_conversation(self, role: str, message: str, agent: str = None):
-        """Save conversation to project history"""
+        """
+        Save conversation to project history
+        
+        Inside batch() the entry is written with the block's other saves,
+        e.g. so a user message and the reply to it are written together.
+        """
         
         if not self.current_project:
             return
@@ -152,13 +316,47 @@ class ProjectTools:
         if agent:
             entry["agent"] = agent
         
-        self.current_project['conversation_history'].append(entry)
+        history = self.current_project['conversation_history']
+        history.append(entry)
+        
+        if len(history) > MAX_HISTORY:
+            self._archive_pending.setdefault(self.current_project['project_id'], []).extend(history[:-MAX_HISTORY])
+            del history[:-MAX_HISTORY]
+        
         self._save_to_file(self.current_project)
     
-    def save_project_state(self, project_state: dict):
+    @contextmanager
+    def batch(self):
+        """
+        Defer project writes until the end of the block
+        
+        Every save inside the block only marks the project; each marked
+        project is written once when the outermost block exits, e.g. so a
+        chat turn that changes context, stage and history writes once.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+    
+    def flush(self):
+        """Write the project saves held back by batch() (also run at exit)"""
+        pending = list(self._batch_pending.values())
+        self._batch_pending.clear()
+        
+        # Written directly, as _save_to_file would hold them back again inside a batch
+        for project_state in pending:
+            self._write_project(project_state)
+    
+    def save_project_state(self, project_state: dict, now_iso: str = None):
         """Save project state (used by workflow manager)"""
-        project_state['updated_at'] = datetime.now().isoformat()
+        project_state['updated_at'] = now_iso or datetime.now().isoformat()
         self.current_project = project_state
+        self._meta_cache = None
+        self._context_blob = None
         self._save_to_file(project_state)
     
     def manage_workflow(self, action: str, reason: str = "", target_stage: str = "") -> str:
@@ -178,25 +376,27 @@ class ProjectTools:
         if not self.current_project:
             return "No active project to manage. Please load or create a project first."
         
-        project_id = self.current_project['project_id']
-        project_name = self.current_project['project_name']
+        proj = self.current_project
+        decisions = proj['decisions']
+        project_name = proj['project_name']
+        now_iso = datetime.now().isoformat()
         
         # STATUS CHANGES
         if action == "cancel":
             if not reason:
                 return "Please provide a reason for cancellation."
             
-            self.current_project['status'] = 'cancelled'
-            self.current_project['cancellation_reason'] = reason
-            self.current_project['cancelled_at'] = datetime.now().isoformat()
+            proj['status'] = 'cancelled'
+            proj['cancellation_reason'] = reason
+            proj['cancelled_at'] = now_iso
             
-            self.current_project['decisions'].append({
-                'timestamp': datetime.now().isoformat(),
+            decisions.append({
+                'timestamp': now_iso,
                 'action': 'cancel',
                 'reason': reason
             })
             
-            self.save_project_state(self.current_project)
+            self.save_project_state(proj, now_iso)
             
             return f"✅ Project '{project_name}' has been cancelled.\n\n**Reason:** {reason}\n\nThe project has been archived and marked as cancelled. All project data has been preserved for future reference."
         
@@ -204,164 +404,119 @@ class ProjectTools:
             if not reason:
                 return "Please provide a reason for pausing the project."
             
-            self.current_project['status'] = 'on_hold'
-            self.current_project['hold_reason'] = reason
-            self.current_project['paused_at'] = datetime.now().isoformat()
+            proj['status'] = 'on_hold'
+            proj['hold_reason'] = reason
+            proj['paused_at'] = now_iso
             
-            self.current_project['decisions'].append({
-                'timestamp': datetime.now().isoformat(),
+            decisions.append({
+                'timestamp': now_iso,
                 'action': 'pause',
                 'reason': reason
             })
             
-            self.save_project_state(self.current_project)
+            self.save_project_state(proj, now_iso)
             
             return f"⏸️ Project '{project_name}' has been put on hold.\n\n**Reason:** {reason}\n\nYou can resume this project anytime by asking me to resume it."
         
         elif action == "resume":
-            if self.current_project['status'] != 'on_hold':
-                return f"Cannot resume: Project is currently {self.current_project['status']}, not on hold. Only paused projects can be resumed."
+            if proj['status'] != 'on_hold':
+                return f"Cannot resume: Project is currently {proj['status']}, not on hold. Only paused projects can be resumed."
             
-            self.current_project['status'] = 'active'
-            self.current_project['resumed_at'] = datetime.now().isoformat()
+            proj['status'] = 'active'
+            proj['resumed_at'] = now_iso
             
-            self.current_project['decisions'].append({
-                'timestamp': datetime.now().isoformat(),
+            decisions.append({
+                'timestamp': now_iso,
                 'action': 'resume'
             })
             
-            self.save_project_state(self.current_project)
+            self.save_project_state(proj, now_iso)
             
-            return f"▶️ Project '{project_name}' has been resumed and is now active again!\n\nWe can continue from where we left off in the {self.current_project['current_stage'].replace('_', ' ')} stage."
+            return f"▶️ Project '{project_name}' has been resumed and is now active again!\n\nWe can continue from where we left off in the {proj['current_stage'].replace('_', ' ')} stage."
         
         elif action == "complete":
-            self.current_project['status'] = 'completed'
-            self.current_project['completed_at'] = datetime.now().isoformat()
+            proj['status'] = 'completed'
+            proj['completed_at'] = now_iso
             
-            self.current_project['decisions'].append({
-                'timestamp': datetime.now().isoformat(),
+            decisions.append({
+                'timestamp': now_iso,
                 'action': 'complete'
             })
             
-            self.save_project_state(self.current_project)
+            self.save_project_state(proj, now_iso)
             
             return f"🎉 Congratulations! Project '{project_name}' has been marked as completed!\n\nAll project data has been saved and the project is now in completed status."
         
         # STAGE TRANSITIONS
         elif action == "advance":
-            stage_flow = [
-                'business_case',
-                'market_research',
-                'rfi_rfp',
-                'evaluation',
-                'summary'
-            ]
-            
-            stage_names = {
-                'business_case': 'Business Case',
-                'market_research': 'Market Research',
-                'rfi_rfp': 'RFI/RFP Development',
-                'evaluation': 'Vendor Evaluation',
-                'summary': 'Executive Summary'
-            }
+            current_index = STAGE_INDEX.get(proj['current_stage'])
             
-            current_stage = self.current_project['current_stage']
+            if current_index is None:
+                return f"Unknown current stage: {proj['current_stage']}"
             
-            if current_stage not in stage_flow:
-                return f"Unknown current stage: {current_stage}"
-            
-            current_index = stage_flow.index(current_stage)
-            
-            if current_index >= len(stage_flow) - 1:
+            if current_index >= len(STAGE_FLOW) - 1:
                 return "Project is already at the final stage (Executive Summary). Consider marking the project as complete instead."
             
-            next_stage = stage_flow[current_index + 1]
-            self.current_project['current_stage'] = next_stage
-            
-            self.current_project['decisions'].append({
-                'timestamp': datetime.now().isoformat(),
-                'action': 'advance',
-                'from_stage': current_stage,
-                'to_stage': next_stage
-            })
-            
-            self.save_project_state(self.current_project)
-            
-            return f"➡️ Advanced to the next stage!\n\n**From:** {stage_names[current_stage]}\n**To:** {stage_names[next_stage]}\n\nThe project is now in the {stage_names[next_stage]} phase."
+            return self._transition_stage(proj, STAGE_FLOW[current_index + 1], action, now_iso)
         
         elif action == "revert":
-            stage_flow = [
-                'business_case',
-                'market_research',
-                'rfi_rfp',
-                'evaluation',
-                'summary'
-            ]
-            
-            stage_names = {
-                'business_case': 'Business Case',
-                'market_research': 'Market Research',
-                'rfi_rfp': 'RFI/RFP Development',
-                'evaluation': 'Vendor Evaluation',
-                'summary': 'Executive Summary'
-            }
-            
-            current_stage = self.current_project['current_stage']
-            current_index = stage_flow.index(current_stage)
+            current_index = STAGE_INDEX[proj['current_stage']]
             
             if current_index <= 0:
                 return "Already at the first stage (Business Case). Cannot go back further."
             
-            previous_stage = stage_flow[current_index - 1]
-            self.current_project['current_stage'] = previous_stage
-            
-            self.current_project['decisions'].append({
-                'timestamp': datetime.now().isoformat(),
-                'action': 'revert',
-                'from_stage': current_stage,
-                'to_stage': previous_stage
-            })
-            
-            self.save_project_state(self.current_project)
-            
-            return f"⬅️ Reverted to previous stage.\n\n**From:** {stage_names[current_stage]}\n**Back to:** {stage_names[previous_stage]}\n\nYou can now work on the {stage_names[previous_stage]} phase."
+            return self._transition_stage(proj, STAGE_FLOW[current_index - 1], action, now_iso)
         
         elif action == "jump_to":
             if not target_stage:
                 return "Please specify which stage to jump to."
             
-            valid_stages = ['business_case', 'market_research', 'rfi_rfp', 'evaluation', 'summary']
-            
-            stage_names = {
-                'business_case': 'Business Case',
-                'market_research': 'Market Research',
-                'rfi_rfp': 'RFI/RFP Development',
-                'evaluation': 'Vendor Evaluation',
-                'summary': 'Executive Summary'
-            }
-            
-            if target_stage not in valid_stages:
+            if target_stage not in STAGE_INDEX:
                 return f"Invalid stage: {target_stage}. Valid stages are: business_case, market_research, rfi_rfp, evaluation, summary"
             
-            old_stage = self.current_project['current_stage']
-            self.current_project['current_stage'] = target_stage
-            
-            self.current_project['decisions'].append({
-                'timestamp': datetime.now().isoformat(),
-                'action': 'jump_to',
-                'from_stage': old_stage,
-                'to_stage': target_stage
-            })
-            
-            self.save_project_state(self.current_project)
-            
-            return f"�� Jumped to {stage_names[target_stage]}!\n\n**From:** {stage_names[old_stage]}\n**To:** {stage_names[target_stage]}\n\nThe project is now in the {stage_names[target_stage]} phase."
+            return self._transition_stage(proj, target_stage, action, now_iso)
         
         else:
             return f"Unknown action: {action}\n\nValid actions are: cancel, pause, resume, complete, advance, revert, jump_to"
     
+    def _transition_stage(self, proj: dict, new_stage: str, action: str, now_iso: str) -> str:
+        """Move the project to another stage, record the decision and describe the move"""
+        old_stage = proj['current_stage']
+        proj['current_stage'] = new_stage
+        
+        proj['decisions'].append({
+            'timestamp': now_iso,
+            'action': action,
+            'from_stage': old_stage,
+            'to_stage': new_stage
+        })
+        
+        self.save_project_state(proj, now_iso)
+        
+        return STAGE_TRANSITION_MESSAGES[action].format(old=STAGE_NAMES[old_stage], new=STAGE_NAMES[new_stage])
+    
+    def _archive_history(self, project_id: str, entries: list):
+        """Append old conversation entries to the project's history archive"""
+        archive_file = self.state_dir / f"{project_id}.history.jsonl"
+        with open(archive_file, 'ab') as f:
+            f.write(b"".join(dumps(entry) + b"\n" for entry in entries))
+    
     def _save_to_file(self, project_state: dict):
         """Save project state to JSON file"""
+        if self._batch_depth:
+            self._batch_pending[project_state['project_id']] = project_state
+            return
+        
+        self._write_project(project_state)
+    
+    def _write_project(self, project_state: dict):
+        """Write a project state file and record it in the index"""
+        # Archive trimmed entries first: a crash in between leaves them in
+        # both files rather than in neither
+        archived = self._archive_pending.pop(project_state['project_id'], None)
+        if archived:
+            self._archive_history(project_state['project_id'], archived)
+        
         project_file = self.state_dir / f"{project_state['project_id']}.json"
-        with open(project_file, 'w') as f:
-            json.dump(project_state, f, indent=2)
+        write_atomic(project_file, dumps(project_state))
+        self._index.update(project_state, project_file.stat().st_mtime_ns)
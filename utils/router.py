@@ -0,0 +1,66 @@
+"""
+Specialist Router
+Routes obvious specialist requests straight to the specialist,
+skipping the coordinator LLM round trip
+"""
+
+import re
+
+# Phrases that point at each specialist (matched case-insensitively)
+SPECIALIST_KEYWORDS = {
+    'market_research': ['vendor', 'market', 'pricing', 'competitor'],
+    'rfi_rfp': ['rfp', 'rfi', 'request for'],
+    'evaluation': ['score', 'evaluate', 'compare proposals'],
+    'business_requirements': ['requirement', 'business case', 'roi', 'kpi'],
+    'summary': ['executive summary', 'recommend']
+}
+
+# Keyword hits needed before a specialist counts as a match
+MIN_HITS = 2
+
+# Project and workflow requests need the coordinator's project tools, so
+# messages that look like one are never routed straight to a specialist
+PROJECT_INTENT_RE = re.compile(
+    r'\b(?:project|stage|context|create|load|switch|status|'
+    r'pause|hold|resume|cancel|complete|finish|advance|revert|jump)',
+    re.IGNORECASE
+)
+
+# One compiled alternation per specialist. Keywords match at the start of a
+# word, so "vendors" counts for "vendor" but "heroic" doesn't count for "roi"
+SPECIALIST_RE = {
+    name: re.compile(r'\b(?:' + '|'.join(map(re.escape, keywords)) + ')', re.IGNORECASE)
+    for name, keywords in SPECIALIST_KEYWORDS.items()
+}
+
+def route(message: str, specialists=None):
+    """
+    Pick the specialist for a message when the choice is obvious
+    
+    Args:
+        message: The user's message
+        specialists: Specialists that may be routed to (e.g. those with a
+            config); all of SPECIALIST_KEYWORDS when None
+    
+    Returns:
+        Specialist type (a ProcurementAgentTeam.AGENT_TYPES entry), or None
+        when the message may be a project request, or when no specialist or
+        more than one specialist matches
+    """
+    if PROJECT_INTENT_RE.search(message):
+        return None
+    
+    match = None
+    
+    # Stop as soon as a second specialist matches
+    for name, pattern in SPECIALIST_RE.items():
+        if specialists is not None and name not in specialists:
+            continue
+        if len(pattern.findall(message)) < MIN_HITS:
+            continue
+        
+        if match is not None:
+            return None
+        match = name
+    
+    return match
@@ -0,0 +1,80 @@
+"""
+JSON Serialization
+Encodes and decodes project state files, using orjson when it is installed
+"""
+
+import json
+import os
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Mode open() gives new files under the process umask; mkstemp always uses 0o600
+_umask = os.umask(0)
+os.umask(_umask)
+NEW_FILE_MODE = 0o666 & ~_umask
+
+def dumps(data, pretty: bool = False) -> bytes:
+    """
+    Serialize data to UTF-8 JSON
+    
+    Args:
+        data: JSON-compatible object
+        pretty: Indent the output for people to read; state files are
+            written compact
+    
+    Returns:
+        Encoded bytes, ready to write to a file opened in binary mode
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(data, indent=2).encode('utf-8')
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def loads(data):
+    """
+    Parse JSON from bytes or str
+    
+    Args:
+        data: Encoded JSON document
+    
+    Returns:
+        The decoded object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def write_atomic(path, data: bytes):
+    """
+    Write bytes to a file atomically
+    
+    The data goes to a temporary file in the same directory, is fsynced,
+    and then replaces the target, so readers see either the old or the new
+    file, never a partial one, even after a crash. The file keeps the
+    target's permissions, or gets the usual ones for a new file.
+    
+    Args:
+        path: Target file path
+        data: Encoded contents
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = NEW_FILE_MODE
+    
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), mode)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
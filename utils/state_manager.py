@@ -3,37 +3,138 @@ Project State Manager
 Handles project creation, loading, and state persistence
 """
 
-import json
+import atexit
+import logging
 import os
+import queue
+import secrets
+import threading
 from datetime import datetime
 from pathlib import Path
-import uuid
+from utils.project_index import ProjectIndex, scan_projects
+from utils.serialization import dumps, loads, write_atomic
+
+logger = logging.getLogger(__name__)
+
+class LazyProject(dict):
+    """
+    Project dict that reads its conversation history on first access
+    
+    Lookups, membership tests, iteration, keys/items/values, copy() and
+    dict(project) all read the history first; truth tests don't, a loaded
+    project is always truthy. Serializers that read the dict's storage
+    directly (orjson, and so jsonify) bypass these, so call load_history()
+    before serializing.
+    """
+    
+    def __init__(self, project_data: dict, read_history):
+        super().__init__(project_data)
+        self._read_history = read_history
+        # Projects saved before the message log keep their history inline
+        self._inline_history = project_data.get("conversation_history", [])
+        self._history_loaded = False
+    
+    def __bool__(self):
+        return True
+    
+    def __getitem__(self, key):
+        if key == "conversation_history":
+            self.load_history()
+        return super().__getitem__(key)
+    
+    def get(self, key, default=None):
+        if key == "conversation_history":
+            self.load_history()
+        return super().get(key, default)
+    
+    def __contains__(self, key):
+        if key == "conversation_history":
+            self.load_history()
+        return super().__contains__(key)
+    
+    def __iter__(self):
+        return super(LazyProject, self.load_history()).__iter__()
+    
+    def __len__(self):
+        return super(LazyProject, self.load_history()).__len__()
+    
+    def keys(self):
+        return super(LazyProject, self.load_history()).keys()
+    
+    def items(self):
+        return super(LazyProject, self.load_history()).items()
+    
+    def values(self):
+        return super(LazyProject, self.load_history()).values()
+    
+    def copy(self) -> dict:
+        return dict(super(LazyProject, self.load_history()).items())
+    
+    def load_history(self) -> "LazyProject":
+        """Read the conversation history into the dict, if not done yet"""
+        if not self._history_loaded:
+            super().__setitem__("conversation_history", self._inline_history + self._read_history())
+            self._history_loaded = True
+        
+        return self
+    
+    def invalidate_history(self):
+        """Read the history again on next access, e.g. after a message was added"""
+        self._history_loaded = False
 
 class ProjectStateManager:
     """Manages project state and persistence"""
     
-    def __init__(self, data_dir: str = "data/projects"):
+    def __init__(self, data_dir: str = "data/projects", flush_interval: float = 0.5, flush_batch_size: int = 20):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.current_project_file = self.data_dir / "current_project.json"
+        # Plain text file holding just the current project id
+        self.current_project_file = self.data_dir / "current_project"
+        
+        # Parsed projects keyed by id, with the file mtime they were read at
+        self._project_cache = {}
+        # Parsed message logs keyed by id, with the log mtime they were read at
+        self._history_cache = {}
+        # Listing fields of every project, kept in index.json
+        self._index = ProjectIndex(self.data_dir, ("project_id", "project_name", "current_stage", "updated_at"))
+        # Ids of cached projects with changes not yet written to disk
+        self._dirty = set()
+        # Messages a flush couldn't write, by project id; retried by the next flush
+        self._unwritten = {}
+        
+        # Messages and project saves are buffered and written by a background
+        # thread, either every flush_interval seconds or once
+        # flush_batch_size messages are queued
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self._start_writer()
+        atexit.register(self.flush)
+        
+        # Threads don't survive fork (e.g. Gunicorn with preload_app)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start_writer)
     
     def create_project(self, project_name: str) -> str:
         """Create a new project"""
-        project_id = str(uuid.uuid4())[:8]
+        # 8 hex characters is only 32 bits, so make sure the id is unused
+        project_id = secrets.token_hex(4)
+        while (self.data_dir / f"{project_id}.json").exists():
+            project_id = secrets.token_hex(4)
+        
+        now_iso = datetime.now().isoformat()
         
         project_data = {
             "project_id": project_id,
             "project_name": project_name,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
+            "created_at": now_iso,
+            "updated_at": now_iso,
             "current_stage": "business_case",
             "context": {},
-            "conversation_history": [],
             "decisions": []
         }
         
-        # Save project
-        self._save_project(project_id, project_data)
+        # Written right away so the project is visible to other processes
+        self._write_project(project_id, project_data)
         
         # Set as current project
         self._set_current_project(project_id)
@@ -41,29 +142,54 @@ class ProjectStateManager:
         return project_id
     
     def load_project(self, project_id: str) -> dict:
-        """Load a project by ID"""
-        project_file = self.data_dir / f"{project_id}.json"
+        """
+        Load a project by ID
         
-        if not project_file.exists():
-            return None
+        Returns a LazyProject: conversation_history is only read from the
+        message log when it is accessed, and then includes messages added
+        after the load.
+        """
+        # Make sure buffered messages are on disk first
+        self.flush()
         
-        with open(project_file, 'r') as f:
-            project_data = json.load(f)
+        project_data = self._read_project(project_id)
+        if not project_data:
+            return None
         
-        # Set as current project
-        self._set_current_project(project_id)
+        return LazyProject(project_data, lambda: self._flushed_history(project_id))
+    
+    def switch_project(self, project_id: str) -> dict:
+        """Load a project and make it the current project"""
+        project_data = self.load_project(project_id)
+        if project_data:
+            self._set_current_project(project_id)
         
         return project_data
     
+    def export_project(self, project_id: str, pretty: bool = True) -> str:
+        """
+        Export a project as a JSON document
+        
+        Args:
+            project_id: The project to export
+            pretty: Indent the JSON for reading (state files are stored compact)
+        
+        Returns:
+            The project as JSON, or None if it doesn't exist
+        """
+        project_data = self.load_project(project_id)
+        if not project_data:
+            return None
+        
+        return dumps(project_data.load_history(), pretty=pretty).decode('utf-8')
+    
     def get_current_project(self) -> dict:
         """Get the currently active project"""
-        if not self.current_project_file.exists():
+        try:
+            current_id = self.current_project_file.read_text().strip()
+        except FileNotFoundError:
             return None
         
-        with open(self.current_project_file, 'r') as f:
-            data = json.load(f)
-        
-        current_id = data.get('current_project_id')
         if not current_id:
             return None
         
@@ -71,30 +197,28 @@ class ProjectStateManager:
     
     def list_projects(self) -> list:
         """List all projects"""
-        projects = []
+        self.flush()
         
-        for project_file in self.data_dir.glob("*.json"):
-            if project_file.name == "current_project.json":
-                continue
-            
-            with open(project_file, 'r') as f:
-                project_data = json.load(f)
-                projects.append({
-                    "project_id": project_data["project_id"],
-                    "project_name": project_data["project_name"],
-                    "current_stage": project_data["current_stage"],
-                    "updated_at": project_data["updated_at"]
-                })
-        
-        # Sort by updated_at descending
-        projects.sort(key=lambda x: x["updated_at"], reverse=True)
-        
-        return projects
-    
-    def add_message(self, project_id: str, role: str, content: str, agent_name: str = None):
-        """Add a message to project conversation history"""
-        project = self.load_project(project_id)
-        if not project:
+        # current_project.json is the pointer file of older versions
+        project_mtimes = scan_projects(self.data_dir, exclude=("current_project.json",))
+        
+        # Sorted by updated_at descending
+        return self._index.summaries(project_mtimes)
+    
+    def add_message(self, project_id: str, role: str, content: str, agent_name: str = None, project: dict = None):
+        """
+        Add a message to project conversation history
+        
+        Messages are appended to the project's {project_id}.log.jsonl log
+        rather than stored in the project file, so adding one doesn't
+        rewrite the whole history.
+        
+        The message is queued and written by the background writer; it is
+        flushed before any read, so callers always see their own messages.
+        Pass the already-loaded project to skip the existence check; its
+        history is then re-read on next access, so it includes the message.
+        """
+        if project is None and not (self.data_dir / f"{project_id}.json").exists():
             raise ValueError(f"Project {project_id} not found")
         
         message = {
@@ -106,53 +230,187 @@ class ProjectStateManager:
         if agent_name:
             message["agent"] = agent_name
         
-        project["conversation_history"].append(message)
-        project["updated_at"] = datetime.now().isoformat()
+        self._message_queue.put_nowait((project_id, message))
+        if self._message_queue.qsize() >= self.flush_batch_size:
+            self._flush_requested.set()
         
-        self._save_project(project_id, project)
+        if isinstance(project, LazyProject):
+            project.invalidate_history()
     
     def update_context(self, project_id: str, context_updates: dict):
         """Update project context"""
-        project = self.load_project(project_id)
-        if not project:
-            raise ValueError(f"Project {project_id} not found")
-        
-        project["context"].update(context_updates)
-        project["updated_at"] = datetime.now().isoformat()
-        
-        self._save_project(project_id, project)
+        with self._write_lock:
+            project = self._read_project(project_id)
+            if not project:
+                raise ValueError(f"Project {project_id} not found")
+            
+            project["context"].update(context_updates)
+            project["updated_at"] = datetime.now().isoformat()
+            
+            self._save_project(project_id, project)
     
     def update_stage(self, project_id: str, new_stage: str):
         """Update project stage"""
-        project = self.load_project(project_id)
-        if not project:
-            raise ValueError(f"Project {project_id} not found")
-        
-        project["current_stage"] = new_stage
-        project["updated_at"] = datetime.now().isoformat()
-        
-        self._save_project(project_id, project)
+        with self._write_lock:
+            project = self._read_project(project_id)
+            if not project:
+                raise ValueError(f"Project {project_id} not found")
+            
+            project["current_stage"] = new_stage
+            project["updated_at"] = datetime.now().isoformat()
+            
+            self._save_project(project_id, project)
     
     def add_decision(self, project_id: str, decision: dict):
         """Add a decision to project history"""
-        project = self.load_project(project_id)
-        if not project:
-            raise ValueError(f"Project {project_id} not found")
+        with self._write_lock:
+            project = self._read_project(project_id)
+            if not project:
+                raise ValueError(f"Project {project_id} not found")
+            
+            now_iso = datetime.now().isoformat()
+            decision["timestamp"] = now_iso
+            project["decisions"].append(decision)
+            project["updated_at"] = now_iso
+            
+            self._save_project(project_id, project)
+    
+    def flush(self):
+        """Write all queued messages and pending saves to disk, one write per project"""
+        with self._write_lock:
+            # Messages held back by a failed flush come first, keeping their order
+            pending = self._unwritten
+            self._unwritten = {}
+            while True:
+                try:
+                    project_id, message = self._message_queue.get_nowait()
+                except queue.Empty:
+                    break
+                pending.setdefault(project_id, []).append(message)
+            
+            # One broken project mustn't cost the messages of the others
+            for project_id, messages in pending.items():
+                try:
+                    project = self._read_project(project_id)
+                    if not project:
+                        continue
+                    
+                    # Appending to the log costs the same however long the history is
+                    with open(self._log_path(project_id), 'ab') as f:
+                        f.write(b"".join(dumps(message) + b"\n" for message in messages))
+                except Exception:
+                    logger.exception("Couldn't write messages of project %s, keeping them for the next flush", project_id)
+                    self._unwritten[project_id] = messages
+                    continue
+                
+                project["updated_at"] = messages[-1]["timestamp"]
+                self._dirty.add(project_id)
+            
+            for project_id in list(self._dirty):
+                try:
+                    self._write_project(project_id, self._project_cache[project_id][1])
+                except Exception:
+                    logger.exception("Couldn't write project %s, keeping it for the next flush", project_id)
+                    continue
+                self._dirty.discard(project_id)
+    
+    def _start_writer(self):
+        """Create the message queue and start the background writer thread"""
+        self._message_queue = queue.Queue()
+        self._flush_requested = threading.Event()
+        self._write_lock = threading.RLock()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+    
+    def _writer_loop(self):
+        """Background thread: flush queued messages periodically"""
+        while True:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            if self._dirty or self._unwritten or not self._message_queue.empty():
+                # flush() keeps what it couldn't write; the thread must survive
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Background flush failed")
+    
+    def _read_project(self, project_id: str) -> dict:
+        """
+        Read a project file without any side effects
+        
+        The parsed project is cached and reused for as long as the file's
+        mtime is unchanged, so repeated loads in one request parse it once.
+        """
+        # Saved but not yet written: the cached copy is the latest
+        if project_id in self._dirty:
+            return self._project_cache[project_id][1]
+        
+        project_file = self.data_dir / f"{project_id}.json"
+        
+        try:
+            mtime = project_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._project_cache.pop(project_id, None)
+            return None
+        
+        cached = self._project_cache.get(project_id)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        
+        project_data = loads(project_file.read_bytes())
         
-        decision["timestamp"] = datetime.now().isoformat()
-        project["decisions"].append(decision)
-        project["updated_at"] = datetime.now().isoformat()
+        self._project_cache[project_id] = (mtime, project_data)
+        return project_data
+    
+    def _log_path(self, project_id: str) -> Path:
+        """Path of a project's append-only message log"""
+        return self.data_dir / f"{project_id}.log.jsonl"
+    
+    def _flushed_history(self, project_id: str) -> list:
+        """Read a project's message log after writing its queued messages"""
+        self.flush()
+        return self._read_history(project_id)
+    
+    def _read_history(self, project_id: str) -> list:
+        """Read a project's message log, cached while the log's mtime is unchanged"""
+        log_file = self._log_path(project_id)
+        
+        try:
+            mtime = log_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
         
-        self._save_project(project_id, project)
+        cached = self._history_cache.get(project_id)
+        if cached is None or cached[0] != mtime:
+            lines = log_file.read_bytes().splitlines()
+            cached = (mtime, [loads(line) for line in lines if line.strip()])
+            self._history_cache[project_id] = cached
+        
+        return list(cached[1])
     
     def _save_project(self, project_id: str, project_data: dict):
-        """Save project to file"""
+        """
+        Save a project
+        
+        The write is left to the background writer, so several saves within
+        flush_interval are coalesced into one write. Reads in the meantime
+        are served from the cache.
+        """
+        with self._write_lock:
+            cached = self._project_cache.get(project_id)
+            self._project_cache[project_id] = (cached[0] if cached else None, project_data)
+            self._dirty.add(project_id)
+    
+    def _write_project(self, project_id: str, project_data: dict):
+        """Write a project to its file"""
         project_file = self.data_dir / f"{project_id}.json"
         
-        with open(project_file, 'w') as f:
-            json.dump(project_data, f, indent=2)
+        write_atomic(project_file, dumps(project_data))
+        
+        mtime = project_file.stat().st_mtime_ns
+        self._project_cache[project_id] = (mtime, project_data)
+        self._index.update(project_data, mtime)
     
     def _set_current_project(self, project_id: str):
         """Set the current active project"""
-        with open(self.current_project_file, 'w') as f:
-            json.dump({"current_project_id": project_id}, f)
+        write_atomic(self.current_project_file, project_id.encode('utf-8'))